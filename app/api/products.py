@@ -1,9 +1,12 @@
 """Product CRUD API endpoints."""
 import math
+from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func, or_
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, delete, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -14,15 +17,40 @@ from app.schemas.product import (
     ProductResponse,
     ProductUpdate,
 )
-from app.services.webhook_service import trigger_webhooks
+from app.services.cache import (
+    cache_key,
+    get_cached,
+    invalidate_cache,
+    set_cached,
+)
+from app.services.webhook_service import dispatch_webhooks
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
+PRODUCT_LIST_CACHE_TTL = 120  # seconds
+PRODUCT_DETAIL_CACHE_TTL = 3600  # seconds
+
+
+def _encode_cursor(product: Product) -> str:
+    """Build an opaque keyset cursor from the last product of a page."""
+    return f"{product.created_at.isoformat()}_{product.id}"
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Parse a keyset cursor into its (created_at, id) position."""
+    try:
+        created_at, product_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(product_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 
 @router.get("", response_model=ProductListResponse)
 def list_products(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from a previous page"),
+    include_total: Optional[bool] = Query(None, description="Include total count"),
     sku: Optional[str] = Query(None, description="Filter by SKU (case-insensitive)"),
     name: Optional[str] = Query(None, description="Filter by name (partial match)"),
     active: Optional[bool] = Query(None, description="Filter by active status"),
@@ -33,18 +61,36 @@ def list_products(
     List products with pagination and filtering.
 
     Query Parameters:
-    - page: Page number (default: 1)
+    - page: Page number (default: 1), ignored when cursor is given
     - page_size: Items per page (default: 50, max: 100)
+    - cursor: Keyset cursor (next_cursor of the previous page)
+    - include_total: Count matching rows (default: only for page-based requests)
     - sku: Filter by exact SKU (case-insensitive)
     - name: Filter by name (partial match, case-insensitive)
     - active: Filter by active status
     - search: Search in SKU, name, and description
     """
+    key = cache_key(
+        "products",
+        page=page,
+        page_size=page_size,
+        cursor=cursor,
+        include_total=include_total,
+        sku=sku,
+        name=name,
+        active=active,
+        search=search,
+    )
+    cached = get_cached(key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
     query = db.query(Product)
 
     # Apply filters
     if sku:
-        query = query.filter(func.lower(Product.sku) == sku.lower())
+        # SKUs are stored lowercase, so this probes the plain unique index
+        query = query.filter(Product.sku == sku.strip().lower())
     if name:
         query = query.filter(Product.name.ilike(f"%{name}%"))
     if active is not None:
@@ -59,148 +105,199 @@ def list_products(
             )
         )
 
-    # Get total count
-    total = query.count()
+    # Get total count (skipped by default for keyset pagination)
+    if include_total is None:
+        include_total = cursor is None
+    total = query.count() if include_total else None
+
+    # Apply pagination; id breaks ties between rows imported in the same batch
+    query = query.order_by(Product.created_at.desc(), Product.id.desc())
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                Product.created_at < cursor_created_at,
+                and_(
+                    Product.created_at == cursor_created_at,
+                    Product.id < cursor_id,
+                ),
+            )
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
 
-    # Apply pagination
-    offset = (page - 1) * page_size
-    items = query.order_by(Product.created_at.desc()).offset(offset).limit(page_size).all()
+    # Fetch one extra row to detect whether another page exists
+    items = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = _encode_cursor(items[-1])
 
     # Calculate total pages
-    pages = math.ceil(total / page_size) if total > 0 else 1
+    pages = None
+    if total is not None:
+        pages = math.ceil(total / page_size) if total > 0 else 1
 
-    return ProductListResponse(
-        items=items,
+    body = ProductListResponse(
+        items=[ProductResponse.from_row(item) for item in items],
         total=total,
         page=page,
         page_size=page_size,
         pages=pages,
-    )
+        next_cursor=next_cursor,
+    ).model_dump_json()
+    set_cached(key, body, PRODUCT_LIST_CACHE_TTL)
+
+    return Response(content=body, media_type="application/json")
 
 
 @router.post("", response_model=ProductResponse, status_code=201)
-async def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+def create_product(
+    product: ProductCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """
     Create a new product.
 
     SKU must be unique (case-insensitive).
     """
-    # Check if SKU already exists (case-insensitive)
-    existing = (
-        db.query(Product)
-        .filter(func.lower(Product.sku) == product.sku.lower())
-        .first()
+    # Insert in one round-trip; the unique SKU indexes reject duplicates
+    stmt = (
+        insert(Product)
+        .values(
+            sku=product.sku.strip().lower(),  # Normalize to lowercase
+            name=product.name,
+            description=product.description,
+            active=product.active,
+        )
+        .on_conflict_do_nothing()
+        .returning(Product)
     )
-    if existing:
+    db_product = db.scalars(stmt).first()
+    if db_product is None:
+        db.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Product with SKU '{product.sku}' already exists",
         )
 
-    # Create new product
-    db_product = Product(
-        sku=product.sku.strip().lower(),  # Normalize to lowercase
-        name=product.name,
-        description=product.description,
-        active=product.active,
-    )
-    db.add(db_product)
+    # Serialize before commit so the response doesn't reload the row
+    response = ProductResponse.model_validate(db_product)
     db.commit()
-    db.refresh(db_product)
+    invalidate_cache("products")
 
-    # Trigger webhooks
-    await trigger_webhooks(
+    # Trigger webhooks after the response is sent
+    background_tasks.add_task(
+        dispatch_webhooks,
         "product.created",
         {
             "event": "product.created",
             "data": {
-                "id": db_product.id,
-                "sku": db_product.sku,
-                "name": db_product.name,
-                "description": db_product.description,
-                "active": db_product.active,
+                "id": response.id,
+                "sku": response.sku,
+                "name": response.name,
+                "description": response.description,
+                "active": response.active,
             },
         },
-        db,
     )
 
-    return db_product
+    return response
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
 def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get a single product by ID."""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    # Keyed on the id's own generation so an update racing with this read
+    # orphans whatever it stores; "product" covers bulk changes and imports
+    key = cache_key("product", f"product:{product_id}")
+    cached = get_cached(key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    product = db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    return product
+    body = ProductResponse.model_validate(product).model_dump_json()
+    set_cached(key, body, PRODUCT_DETAIL_CACHE_TTL)
+
+    return Response(content=body, media_type="application/json")
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
-async def update_product(
-    product_id: int, product_update: ProductUpdate, db: Session = Depends(get_db)
+def update_product(
+    product_id: int,
+    product_update: ProductUpdate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
 ):
     """
     Update a product.
 
     Only provided fields will be updated.
     """
-    # Get existing product
-    db_product = db.query(Product).filter(Product.id == product_id).first()
-    if not db_product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    # Check if SKU is being updated and if it conflicts
-    if product_update.sku is not None:
-        sku_lower = product_update.sku.lower()
-        existing = (
-            db.query(Product)
-            .filter(func.lower(Product.sku) == sku_lower)
-            .filter(Product.id != product_id)
-            .first()
+    values = product_update.model_dump(exclude_none=True)
+    if "sku" in values:
+        values["sku"] = values["sku"].lower()
+
+    if values:
+        # Single UPDATE ... RETURNING; the unique SKU indexes reject conflicts
+        stmt = (
+            update(Product)
+            .where(Product.id == product_id)
+            .values(**values)
+            .returning(Product)
         )
-        if existing:
+        try:
+            db_product = db.scalars(stmt).first()
+        except IntegrityError:
+            db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail=f"Product with SKU '{product_update.sku}' already exists",
             )
-        db_product.sku = sku_lower
+    else:
+        db_product = db.get(Product, product_id)
 
-    # Update other fields
-    if product_update.name is not None:
-        db_product.name = product_update.name
-    if product_update.description is not None:
-        db_product.description = product_update.description
-    if product_update.active is not None:
-        db_product.active = product_update.active
+    if not db_product:
+        raise HTTPException(status_code=404, detail="Product not found")
 
+    # Serialize before commit so the response doesn't reload the row
+    response = ProductResponse.model_validate(db_product)
     db.commit()
-    db.refresh(db_product)
+    invalidate_cache(
+        "products", f"product:{product_id}", ttl=2 * PRODUCT_DETAIL_CACHE_TTL
+    )
 
-    # Trigger webhooks
-    await trigger_webhooks(
+    # Trigger webhooks after the response is sent
+    background_tasks.add_task(
+        dispatch_webhooks,
         "product.updated",
         {
             "event": "product.updated",
             "data": {
-                "id": db_product.id,
-                "sku": db_product.sku,
-                "name": db_product.name,
-                "description": db_product.description,
-                "active": db_product.active,
+                "id": response.id,
+                "sku": response.sku,
+                "name": response.name,
+                "description": response.description,
+                "active": response.active,
             },
         },
-        db,
     )
 
-    return db_product
+    return response
 
 
 @router.delete("/{product_id}", status_code=204)
-async def delete_product(product_id: int, db: Session = Depends(get_db)):
+def delete_product(
+    product_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
     """Delete a single product."""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    product = db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -213,12 +310,15 @@ async def delete_product(product_id: int, db: Session = Depends(get_db)):
 
     db.delete(product)
     db.commit()
+    invalidate_cache(
+        "products", f"product:{product_id}", ttl=2 * PRODUCT_DETAIL_CACHE_TTL
+    )
 
-    # Trigger webhooks
-    await trigger_webhooks(
+    # Trigger webhooks after the response is sent
+    background_tasks.add_task(
+        dispatch_webhooks,
         "product.deleted",
         {"event": "product.deleted", "data": product_data},
-        db,
     )
 
     return None
@@ -231,7 +331,17 @@ def bulk_delete_products(db: Session = Depends(get_db)):
 
     Returns the count of deleted products.
     """
-    deleted_count = db.query(Product).delete()
+    if db.get_bind().dialect.name == "postgresql":
+        # TRUNCATE skips per-row deletes; lock first so the count stays exact
+        db.execute(text("LOCK TABLE products IN ACCESS EXCLUSIVE MODE"))
+        deleted_count = db.scalar(select(func.count()).select_from(Product))
+        db.execute(text("TRUNCATE products"))
+    else:
+        result = db.execute(
+            delete(Product).execution_options(synchronize_session=False)
+        )
+        deleted_count = result.rowcount
     db.commit()
+    invalidate_cache("products", "product")
 
     return {"deleted_count": deleted_count}
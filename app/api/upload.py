@@ -1,9 +1,13 @@
 """CSV upload API endpoints."""
 import logging
+import os
+import shutil
 import uuid
 from pathlib import Path
+from typing import BinaryIO
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
@@ -18,24 +22,87 @@ from app.tasks.import_tasks import process_csv_import
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
 # Create temp directory for file uploads
 TEMP_DIR = Path("/tmp/uploads")
 TEMP_DIR.mkdir(exist_ok=True)
 
+# Upload limits
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
+COPY_CHUNK_SIZE = 1024 * 1024  # 1MB
 
 
+class _SizeLimitedWriter:
+    """File wrapper that rejects writes once the upload limit is exceeded."""
+
+    def __init__(self, buffer: BinaryIO, limit: int):
+        self.buffer = buffer
+        self.limit = limit
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        self.bytes_written += len(data)
+        if self.bytes_written > self.limit:
+            raise HTTPException(status_code=413, detail="File too large (max 100MB)")
+        return self.buffer.write(data)
+
+
+def _save_upload(source: BinaryIO, destination: Path) -> int:
+    """
+    Copy an uploaded file to disk in a single pass, enforcing the size limit.
+
+    When the upload has already been spooled to a real file, the copy is
+    done in-kernel with os.sendfile. Otherwise it falls back to a chunked
+    copy. Runs synchronously; call it through the threadpool from async
+    handlers.
+
+    Args:
+        source: Underlying file object of the upload
+        destination: Path to write the file to
+
+    Returns:
+        Number of bytes written
+    """
+    # Same check Starlette uses for UploadFile: in-memory spooled files
+    # have no usable descriptor and would need a rollover (extra copy).
+    if getattr(source, "_rolled", True) and hasattr(os, "sendfile"):
+        try:
+            source_fd = source.fileno()
+        except (AttributeError, OSError):
+            source_fd = None
+
+        if source_fd is not None:
+            file_size = os.fstat(source_fd).st_size
+            if file_size > MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413, detail="File too large (max 100MB)")
+
+            with open(destination, "wb") as buffer:
+                offset = 0
+                while offset < file_size:
+                    sent = os.sendfile(
+                        buffer.fileno(), source_fd, offset, file_size - offset
+                    )
+                    if sent == 0:
+                        break
+                    offset += sent
+            return offset
+
+    with open(destination, "wb") as buffer:
+        writer = _SizeLimitedWriter(buffer, MAX_UPLOAD_SIZE)
+        shutil.copyfileobj(source, writer, length=COPY_CHUNK_SIZE)
+    return writer.bytes_written
 
 
 @router.get("/{job_id}", response_model=UploadJobResponse)
-async def get_upload_status(job_id: str, db: Session = Depends(get_db)):
+def get_upload_status(job_id: uuid.UUID, db: Session = Depends(get_db)):
     """
     Get upload job status and progress.
 
     This endpoint is used for polling-based progress tracking
     as a fallback when Server-Sent Events (SSE) are not available.
     """
-    job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
+    job = db.get(UploadJob, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -60,69 +127,55 @@ async def upload_csv(
 
     Perfect for handling 500k+ record CSV files on platforms with timeout limits.
     """
-    logger = logging.getLogger(__name__)
-
-    logger.info(f"📁 Starting CSV upload: filename={file.filename}, content_type={file.content_type}")
+    logger.info("📁 Starting CSV upload: filename=%s", file.filename)
 
     # Validate file type
     if not file.filename.lower().endswith('.csv'):
-        logger.warning(f"❌ Invalid file type: {file.filename}")
+        logger.warning("❌ Invalid file type: %s", file.filename)
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
 
-    logger.info("✅ File type validation passed")
+    logger.debug("✅ File type validation passed")
 
-    # Validate file size (max 100MB to prevent abuse)
-    logger.info("🔍 Starting file size validation...")
-    file_size = 0
-    content = await file.read(1024)  # Read first 1KB
-    while content:
-        file_size += len(content)
-        if file_size > 100 * 1024 * 1024:  # 100MB limit
-            logger.warning(f"❌ File too large: {file_size} bytes")
-            raise HTTPException(status_code=413, detail="File too large (max 100MB)")
-        content = await file.read(1024)
+    # Reject oversized uploads before copying a single byte; the multipart
+    # parser has already measured the spooled file.
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE:
+        logger.warning("❌ File too large: %s (%d bytes)", file.filename, file.size)
+        raise HTTPException(status_code=413, detail="File too large (max 100MB)")
 
-    logger.info(f"✅ File size validation passed: {file_size} bytes")
+    # Generate job ID
+    job_id = str(uuid.uuid4())
+    logger.debug("🆔 Created job ID: %s", job_id)
+    temp_file_path = TEMP_DIR / f"{job_id}.csv"
 
-    # Reset file pointer
-    await file.seek(0)
+    # Save file to temp storage; size is re-checked while copying in case
+    # the parser did not report it
+    logger.debug("💾 Starting file save to: %s", temp_file_path)
+    try:
+        await file.seek(0)
+        bytes_written = await run_in_threadpool(_save_upload, file.file, temp_file_path)
+    except HTTPException:
+        logger.warning("❌ File too large: %s", file.filename)
+        temp_file_path.unlink(missing_ok=True)
+        raise
+    except Exception as e:
+        logger.error("💥 Upload failed for job %s: %s", job_id, e, exc_info=True)
+        temp_file_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
-    # Create job record
-    job_id = str(uuid.uuid4())
-    logger.info(f"🆔 Created job ID: {job_id}")
+    logger.debug("✅ File saved successfully: %d bytes written", bytes_written)
 
-    job = UploadJob(id=job_id, filename=file.filename, status="uploading")
+    job = UploadJob(id=job_id, filename=file.filename, status="uploaded")
     db.add(job)
     db.commit()
-    logger.info(f"💾 Job record created in database: status=uploading")
+    logger.debug("💾 Job record created in database: status=uploaded")
 
     try:
-        # Save file to temp storage
-        temp_file_path = TEMP_DIR / f"{job_id}.csv"
-        logger.info(f"💾 Starting file save to: {temp_file_path}")
-
-        bytes_written = 0
-        with open(temp_file_path, "wb") as buffer:
-            # Stream file in chunks to handle large files
-            content = await file.read(8192)  # 8KB chunks
-            while content:
-                buffer.write(content)
-                bytes_written += len(content)
-                content = await file.read(8192)
-
-        logger.info(f"✅ File saved successfully: {bytes_written} bytes written")
-
-        # Update job status and trigger background processing
-        job.status = "uploaded"
-        db.commit()
-        logger.info("📊 Job status updated to 'uploaded'")
-
         # Process CSV in background (will take 3-5 minutes for 500k records)
-        logger.info("🚀 Triggering Celery background task...")
+        logger.debug("🚀 Triggering Celery background task...")
         process_csv_import.delay(job_id, str(temp_file_path))
-        logger.info("✅ Celery task triggered successfully")
+        logger.debug("✅ Celery task triggered successfully")
 
-        logger.info(f"🎉 Upload completed successfully for job {job_id}")
+        logger.info("🎉 Upload completed successfully for job %s", job_id)
 
         return UploadResponse(
             job_id=job_id,
@@ -131,17 +184,16 @@ async def upload_csv(
         )
 
     except Exception as e:
-        logger.error(f"💥 Upload failed for job {job_id}: {str(e)}", exc_info=True)
+        logger.error("💥 Upload failed for job %s: %s", job_id, e, exc_info=True)
 
         # Clean up on error
         db.delete(job)
         db.commit()
-        logger.info(f"🧹 Cleaned up job record from database: {job_id}")
+        logger.debug("🧹 Cleaned up job record from database: %s", job_id)
 
         # Clean up temp file if it exists
-        temp_file_path = TEMP_DIR / f"{job_id}.csv"
         if temp_file_path.exists():
             temp_file_path.unlink()
-            logger.info(f"🧹 Cleaned up temp file: {temp_file_path}")
+            logger.debug("🧹 Cleaned up temp file: %s", temp_file_path)
 
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
@@ -1,7 +1,10 @@
 """Webhook CRUD API endpoints."""
-from typing import List
+import hashlib
+from typing import List, Union
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -12,20 +15,63 @@ from app.schemas.webhook import (
     WebhookTestResponse,
     WebhookUpdate,
 )
-from app.services.webhook_service import test_webhook
+from app.services.cache import (
+    cache_key,
+    get_cached,
+    invalidate_cache,
+    set_cached,
+)
+from app.services.webhook_service import clear_webhook_url_cache, test_webhook
 
 router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
 
+# Webhooks change rarely, so cached responses can live longer than products'
+WEBHOOK_CACHE_TTL = 300
+
+_webhook_list_adapter = TypeAdapter(List[WebhookResponse])
+
+
+def _conditional_response(request: Request, body: Union[str, bytes]) -> Response:
+    """
+    Return a JSON body with an ETag, or an empty 304 if the client has it.
+
+    The ETag hashes the serialized body, so cached responses can be
+    validated without touching the database.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        body: Serialized JSON response body
+
+    Returns:
+        200 response with an ETag header, or 304 Not Modified
+    """
+    if isinstance(body, str):
+        body = body.encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
 
 @router.get("", response_model=List[WebhookResponse])
-def list_webhooks(db: Session = Depends(get_db)):
+def list_webhooks(request: Request, db: Session = Depends(get_db)):
     """
     List all webhooks.
 
     Returns all configured webhooks with their settings.
     """
+    key = cache_key("webhooks")
+    cached = get_cached(key)
+    if cached is not None:
+        return _conditional_response(request, cached)
+
     webhooks = db.query(Webhook).order_by(Webhook.created_at.desc()).all()
-    return webhooks
+    body = _webhook_list_adapter.dump_json(
+        [WebhookResponse.from_row(webhook) for webhook in webhooks]
+    )
+    set_cached(key, body, WEBHOOK_CACHE_TTL)
+
+    return _conditional_response(request, body)
 
 
 @router.post("", response_model=WebhookResponse, status_code=201)
@@ -41,23 +87,35 @@ def create_webhook(webhook: WebhookCreate, db: Session = Depends(get_db)):
     db.add(db_webhook)
     db.commit()
     db.refresh(db_webhook)
+    invalidate_cache("webhooks")
+    clear_webhook_url_cache()
 
     return db_webhook
 
 
 @router.get("/{webhook_id}", response_model=WebhookResponse)
-def get_webhook(webhook_id: int, db: Session = Depends(get_db)):
+def get_webhook(webhook_id: int, request: Request, db: Session = Depends(get_db)):
     """
     Get a single webhook by ID.
 
     Args:
         webhook_id: ID of the webhook to retrieve
     """
-    webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
+    # Keyed on the id's own generation so an update racing with this read
+    # orphans whatever it stores
+    key = cache_key(f"webhook:{webhook_id}")
+    cached = get_cached(key)
+    if cached is not None:
+        return _conditional_response(request, cached)
+
+    webhook = db.get(Webhook, webhook_id)
     if not webhook:
         raise HTTPException(status_code=404, detail="Webhook not found")
 
-    return webhook
+    body = WebhookResponse.model_validate(webhook).model_dump_json()
+    set_cached(key, body, WEBHOOK_CACHE_TTL)
+
+    return _conditional_response(request, body)
 
 
 @router.put("/{webhook_id}", response_model=WebhookResponse)
@@ -73,7 +131,7 @@ def update_webhook(
         webhook_id: ID of the webhook to update
         webhook_update: Updated webhook data
     """
-    db_webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
+    db_webhook = db.get(Webhook, webhook_id)
     if not db_webhook:
         raise HTTPException(status_code=404, detail="Webhook not found")
 
@@ -87,6 +145,8 @@ def update_webhook(
 
     db.commit()
     db.refresh(db_webhook)
+    invalidate_cache("webhooks", f"webhook:{webhook_id}", ttl=2 * WEBHOOK_CACHE_TTL)
+    clear_webhook_url_cache()
 
     return db_webhook
 
@@ -99,12 +159,14 @@ def delete_webhook(webhook_id: int, db: Session = Depends(get_db)):
     Args:
         webhook_id: ID of the webhook to delete
     """
-    webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
+    webhook = db.get(Webhook, webhook_id)
     if not webhook:
         raise HTTPException(status_code=404, detail="Webhook not found")
 
     db.delete(webhook)
     db.commit()
+    invalidate_cache("webhooks", f"webhook:{webhook_id}", ttl=2 * WEBHOOK_CACHE_TTL)
+    clear_webhook_url_cache()
 
     return None
 
@@ -119,7 +181,8 @@ async def test_webhook_endpoint(webhook_id: int, db: Session = Depends(get_db)):
     Args:
         webhook_id: ID of the webhook to test
     """
-    webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
+    # Blocking DB lookup runs in the threadpool so the event loop stays free
+    webhook = await run_in_threadpool(db.get, Webhook, webhook_id)
     if not webhook:
         raise HTTPException(status_code=404, detail="Webhook not found")
 
@@ -11,8 +11,17 @@ class Settings(BaseSettings):
     app_env: str = "development"
     database_url: str
 
+    # Database connection pool (per process)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # Set when DATABASE_URL points at PgBouncer in transaction pooling mode
+    db_use_pgbouncer: bool = False
+
     # Redis (for Celery)
     redis_url: str = "redis://localhost:6379/0"
+    celery_broker_pool_limit: int = 10
+    # Worker processes; also the number of chunks a large import is split into
+    celery_concurrency: int = 1
 
     # Supabase
     supabase_url: str
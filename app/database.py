@@ -1,28 +1,55 @@
 """Database connection and session management."""
-from sqlalchemy import create_engine, event
+import logging
+
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import NullPool
 
 from app.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+STATEMENT_TIMEOUT_MS = 30000
+WARM_UP_CONNECTIONS = 2  # connections opened at startup, at most pool_size
+
+if settings.db_use_pgbouncer:
+    # PgBouncer owns connection multiplexing; keep no idle connections here
+    engine = create_engine(settings.database_url, poolclass=NullPool)
+else:
+    engine = create_engine(
+        settings.database_url,
+        # Sent in the startup packet, so the timeout costs no extra round-trip
+        connect_args={"options": f"-c statement_timeout={STATEMENT_TIMEOUT_MS}"},
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+    )
+
 
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Import tasks commit once per batch; keeping loaded objects unexpired
+# avoids a reload SELECT the next time the job is read after a commit
+ImportSession = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
 
 
-@event.listens_for(engine, "connect")
-def set_search_path(dbapi_connection, connection_record):
-    """Disable prepared statements for pgbouncer compatibility."""
-    cursor = dbapi_connection.cursor()
-    cursor.execute("SET statement_timeout = '30s'")
-    cursor.close()
+def set_statement_timeout(session, transaction, connection):
+    """
+    Apply the statement timeout to every transaction behind PgBouncer.
 
+    PgBouncer rejects the startup "options" parameter and does not preserve
+    session-level SET state, so the timeout is set per transaction instead.
+    """
+    if settings.db_use_pgbouncer and connection.dialect.name == "postgresql":
+        connection.execute(text(f"SET LOCAL statement_timeout = {STATEMENT_TIMEOUT_MS}"))
+
+
+for _factory in (SessionLocal, ImportSession):
+    event.listen(_factory, "after_begin", set_statement_timeout)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -34,3 +61,23 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def warm_up_pool() -> None:
+    """
+    Open a few pooled connections up front so early requests skip connecting.
+
+    Best-effort: a database that is down or slow at startup is logged and
+    left for the first requests to retry.
+    """
+    if settings.db_use_pgbouncer:
+        return
+    connections = []
+    try:
+        for _ in range(min(settings.db_pool_size, WARM_UP_CONNECTIONS)):
+            connections.append(engine.connect())
+    except Exception as e:
+        logger.warning("⚠️ Could not warm up database pool: %s", e)
+    finally:
+        for connection in connections:
+            connection.close()
@@ -1,26 +1,32 @@
 """FastAPI application entry point."""
 import logging
+import queue
 from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.api.products import router as products_router
 from app.api.upload import router as upload_router
 from app.api.webhooks import router as webhooks_router
-from app.database import engine, Base
+from app.database import engine, Base, warm_up_pool
 from app.models import Product, UploadJob, Webhook  # noqa: F401 - Import to register models
+from app.services.webhook_service import close_client
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),  # Console output
-        logging.FileHandler("app.log"),  # File output
-    ],
-)
+# Configure logging: log calls only enqueue records, and a background
+# listener thread does the console and file I/O
+log_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+console_handler = logging.StreamHandler()  # Console output
+console_handler.setFormatter(log_formatter)
+file_handler = logging.FileHandler("app.log")  # File output
+file_handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, console_handler, file_handler)
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(log_queue)])
 
 # Set specific log levels for noisy libraries
 logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -31,9 +37,13 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create database tables on startup."""
+    """Start logging, create database tables and warm the connection pool."""
+    log_listener.start()
     Base.metadata.create_all(bind=engine)
+    warm_up_pool()
     yield
+    await close_client()
+    log_listener.stop()
 
 
 app = FastAPI(
@@ -41,6 +51,7 @@ app = FastAPI(
     description="Import products from CSV files into a SQL database",
     version="0.1.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -1,7 +1,18 @@
 """Product model."""
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Index
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    event,
+)
 from sqlalchemy.sql import func
 
 from app.database import Base
@@ -23,8 +34,38 @@ class Product(Base):
     )
 
     __table_args__ = (
-        Index("idx_products_sku_lower", func.lower(sku), unique=True),
+        # SKUs are stored lowercase, so the plain unique index on sku both
+        # enforces case-insensitive uniqueness and serves ON CONFLICT (sku)
+        CheckConstraint("sku = lower(sku)", name="ck_products_sku_lowercase"),
+        Index("idx_products_created_at_id", created_at.desc(), id.desc()),
+        # Trigram indexes let ILIKE '%term%' filters use a bitmap index scan
+        Index(
+            "idx_products_sku_trgm",
+            sku,
+            postgresql_using="gin",
+            postgresql_ops={"sku": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_products_name_trgm",
+            name,
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_products_description_trgm",
+            description,
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
     )
 
     def __repr__(self):
         return f"<Product(id={self.id}, sku='{self.sku}', name='{self.name}')>"
+
+
+# gin_trgm_ops requires the pg_trgm extension to exist before the indexes
+event.listen(
+    Product.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
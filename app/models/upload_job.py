@@ -2,8 +2,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, DateTime, Integer, String, Text, Uuid
 from sqlalchemy.sql import func
 
 from app.database import Base
@@ -14,7 +13,8 @@ class UploadJob(Base):
 
     __tablename__ = "upload_jobs"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    # Native UUID on PostgreSQL, CHAR(32) elsewhere (e.g. SQLite in tests)
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4)
     filename = Column(String(500), nullable=False)
     status = Column(
         String(50), nullable=False, default="pending"
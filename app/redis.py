@@ -0,0 +1,19 @@
+"""Shared Redis connection pool."""
+import redis
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# One pool per process; callers block briefly for a free connection
+# instead of opening unbounded sockets under load.
+redis_pool = redis.BlockingConnectionPool.from_url(
+    settings.redis_url,
+    max_connections=128,
+    timeout=1,
+    socket_timeout=0.5,
+    socket_connect_timeout=0.5,
+    health_check_interval=30,
+)
+
+redis_client = redis.Redis(connection_pool=redis_pool)
@@ -39,12 +39,20 @@ class ProductResponse(ProductBase):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_row(cls, product) -> "ProductResponse":
+        """Build from a trusted database row without re-running validation."""
+        return cls.model_construct(
+            **{field: getattr(product, field) for field in cls.model_fields}
+        )
+
 
 class ProductListResponse(BaseModel):
     """Schema for paginated product list responses."""
 
     items: list[ProductResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    pages: int
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None
@@ -37,6 +37,13 @@ class WebhookResponse(WebhookBase):
     class Config:
         from_attributes = True
 
+    @classmethod
+    def from_row(cls, webhook) -> "WebhookResponse":
+        """Build from a trusted database row without re-running validation."""
+        return cls.model_construct(
+            **{field: getattr(webhook, field) for field in cls.model_fields}
+        )
+
 
 class WebhookTestResponse(BaseModel):
     """Response from webhook test."""
@@ -0,0 +1,103 @@
+"""Redis response cache with namespace-level invalidation."""
+import hashlib
+import logging
+from typing import Optional, Union
+
+import redis
+
+from app.redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _generation_key(namespace: str) -> str:
+    return f"cache:{namespace}:generation"
+
+
+def cache_key(*namespaces: str, **params) -> Optional[str]:
+    """
+    Build a cache key for the current generation of one or more namespaces.
+
+    Keys embed each namespace's generation, so bumping any of them with
+    invalidate_cache() orphans the entry (it expires via TTL).
+    Call this before reading from the database so data loaded during a
+    concurrent invalidation is stored under the old generation.
+
+    Args:
+        *namespaces: Cache namespaces (e.g., "products")
+        **params: Values that identify the cached response
+
+    Returns:
+        Cache key, or None if Redis is unavailable
+    """
+    digest = hashlib.sha1(repr(sorted(params.items())).encode()).hexdigest()
+    try:
+        generations = redis_client.mget([_generation_key(ns) for ns in namespaces])
+    except redis.RedisError as e:
+        logger.warning("Cache unavailable: %s", e)
+        return None
+    parts = [
+        f"{ns}:{(generation or b'0').decode()}"
+        for ns, generation in zip(namespaces, generations)
+    ]
+    return f"cache:{':'.join(parts)}:{digest}"
+
+
+def get_cached(key: Optional[str]) -> Optional[bytes]:
+    """
+    Get a cached value.
+
+    Args:
+        key: Key from cache_key()
+
+    Returns:
+        Cached bytes, or None on a miss or if Redis is unavailable
+    """
+    if key is None:
+        return None
+    try:
+        return redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning("Cache read failed: %s", e)
+        return None
+
+
+def set_cached(key: Optional[str], value: Union[str, bytes], ttl: int) -> None:
+    """
+    Store a value in the cache.
+
+    Args:
+        key: Key from cache_key()
+        value: Serialized value
+        ttl: Expiry in seconds
+    """
+    if key is None:
+        return
+    try:
+        redis_client.set(key, value, ex=ttl)
+    except redis.RedisError as e:
+        logger.warning("Cache write failed: %s", e)
+
+
+def invalidate_cache(*namespaces: str, ttl: Optional[int] = None) -> None:
+    """
+    Invalidate every cached entry in one or more namespaces.
+
+    All namespaces are bumped in a single pipelined round-trip.
+
+    Args:
+        *namespaces: Cache namespaces to invalidate
+        ttl: Expire the generation counters after this many seconds without
+            another invalidation; must outlast the entries cached under
+            them, including ones stored by reads still in flight. Use it
+            for per-id namespaces, so they don't pile up in Redis.
+    """
+    try:
+        with redis_client.pipeline(transaction=False) as pipe:
+            for namespace in namespaces:
+                pipe.incr(_generation_key(namespace))
+                if ttl is not None:
+                    pipe.expire(_generation_key(namespace), ttl)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Cache invalidation failed for %s: %s", namespaces, e)
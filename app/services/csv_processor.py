@@ -1,205 +1,457 @@
-"""CSV processing service for batch import with UPSERT."""
+"""CSV processing service for staged batch import with UPSERT."""
 import csv
 import logging
+import os
+import sys
+import time
+import uuid
 from io import StringIO
+from typing import BinaryIO, Iterator, Optional
 
-from sqlalchemy import func
-from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy import text, update
 from sqlalchemy.orm import Session
 
 from app.config import get_settings
-from app.models.product import Product
 from app.models.upload_job import UploadJob
-
-BATCH_SIZE = 1000
+from app.services.cache import invalidate_cache
+from app.tasks.webhook_tasks import send_webhook_event
+
+BATCH_SIZE = 5000
+PROGRESS_INTERVAL = 1.0  # seconds between progress updates
+
+# Rows of every running import, keyed by job and by the file offset where
+# each row ends, so chunks of one file can be staged in parallel and merged
+# in file order. UNLOGGED: staged rows are disposable and skip the WAL.
+STAGING_TABLE_SQL = """
+CREATE UNLOGGED TABLE IF NOT EXISTS import_staging (
+    job_id UUID NOT NULL,
+    position BIGINT NOT NULL,
+    sku TEXT NOT NULL,
+    name TEXT NOT NULL,
+    description TEXT,
+    PRIMARY KEY (job_id, position)
+)
+"""
+
+COPY_STAGING_SQL = (
+    "COPY import_staging (job_id, position, sku, name, description) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+
+CLEAR_STAGED_RANGE_SQL = """
+DELETE FROM import_staging
+WHERE job_id = :job_id AND position > :start AND position <= :end
+"""
+
+CLEAR_STAGED_JOB_SQL = "DELETE FROM import_staging WHERE job_id = :job_id"
+
+# Moves the job's first :limit staged rows (in file order) into products in
+# one statement, so every window is merged and cleared atomically
+MERGE_STAGED_WINDOW_SQL = """
+WITH merged AS (
+    DELETE FROM import_staging
+    WHERE (job_id, position) IN (
+        SELECT job_id, position
+        FROM import_staging
+        WHERE job_id = :job_id
+        ORDER BY position
+        LIMIT :limit
+    )
+    RETURNING position, sku, name, description
+),
+upserted AS (
+    INSERT INTO products (sku, name, description, active)
+    SELECT DISTINCT ON (sku) sku, name, description, TRUE
+    FROM merged
+    ORDER BY sku, position DESC
+    ON CONFLICT (sku) DO UPDATE
+    SET name = EXCLUDED.name,
+        description = EXCLUDED.description,
+        updated_at = now()
+    RETURNING (xmax = 0) AS inserted
+)
+SELECT
+    (SELECT count(*) FROM merged),
+    count(*) FILTER (WHERE inserted),
+    count(*) FILTER (WHERE NOT inserted)
+FROM upserted
+"""
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
-def process_csv_content(csv_content: str, job_id: str, db: Session) -> None:
+def split_ranges(file_path: str, parts: int) -> list[tuple[int, int]]:
+    """
+    Split the rows of a CSV file into byte ranges for parallel processing.
+
+    Ranges start right after the header and end on row boundaries. Split
+    points are taken from a csv.reader pass, so quoted newlines and stray
+    quotes inside unquoted fields (e.g. `TV 5" screen`) never split a row.
+    Assumes the header fits on one line.
+
+    Args:
+        file_path: Path to the CSV file
+        parts: Number of ranges wanted
+
+    Returns:
+        List of (start, end) byte offsets; fewer than parts for small files
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        body_start = len(f.readline())
+        step = max((file_size - body_start) // max(parts, 1), 1)
+        boundaries = [body_start]
+        target = body_start + step
+
+        # Only the row boundaries are needed; parsing stops at the last split
+        lines = _RangeLines(f, body_start, file_size)
+        if parts > 1:
+            for _ in csv.reader(lines):
+                if lines.position >= target:
+                    boundaries.append(lines.position)
+                    if len(boundaries) == parts:
+                        break
+                    target = body_start + step * len(boundaries)
+
+    boundaries.append(file_size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+class _RangeLines:
+    """Iterate the decoded lines of a byte range, tracking bytes consumed."""
+
+    def __init__(self, f: BinaryIO, start: int, end: int):
+        self._file = f
+        self._end = end
+        self.position = start
+        f.seek(start)
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self._file:
+            if self.position >= self._end:
+                return
+            self.position += len(line)
+            yield line.decode("utf-8")
+
+
+def process_csv_content(
+    file_path: str,
+    job_id: str,
+    db: Session,
+    byte_range: Optional[tuple[int, int]] = None,
+) -> dict:
+    """
+    Stream CSV rows, validate, and COPY them into the staging table.
+    Updates progress at most once per PROGRESS_INTERVAL, and once at the end.
+    Only the current batch is held in memory; products are written later by
+    merge_staged_rows(), once every range of the file is staged.
+
+    Rows previously staged for the range are cleared first, so a redelivered
+    task stages each row once. The job's total_rows is incremented rather
+    than overwritten, so several ranges of one file can be staged
+    concurrently; it is extrapolated from the bytes read so far and
+    corrected to the exact row count when the range is done.
+
+    Args:
+        file_path: Path to the CSV file
+        job_id: Upload job ID for tracking progress
+        db: Database session
+        byte_range: (start, end) offsets from split_ranges(); whole file if None
+
+    Returns:
+        Dict with rows read and rows staged for the range
     """
-    Stream CSV from string content, validate, and batch insert with UPSERT.
-    Updates progress every BATCH_SIZE rows.
+    logger.info("⚙️ Starting CSV content processing for job %s", job_id)
+    with open(file_path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8")]), [])
+        if byte_range is None:
+            byte_range = (f.tell(), os.path.getsize(file_path))
+        db.execute(
+            text(CLEAR_STAGED_RANGE_SQL),
+            {"job_id": job_id, "start": byte_range[0], "end": byte_range[1]},
+        )
+        db.commit()
+        lines = _RangeLines(f, *byte_range)
+        return _process_rows(
+            csv.reader(lines), _column_indexes(header), lines, byte_range, job_id, db
+        )
+
+
+def _process_rows(
+    reader,
+    column_indexes: tuple[int, int, Optional[int]],
+    lines: _RangeLines,
+    byte_range: tuple[int, int],
+    job_id: str,
+    db: Session,
+) -> dict:
+    """
+    Validate parsed CSV rows and stage them in batches.
 
     Args:
-        csv_content: CSV file content as string
+        reader: csv.reader over the rows of the range (no header)
+        column_indexes: Column positions from _column_indexes()
+        lines: Line source of the reader, for the bytes consumed so far
+        byte_range: (start, end) offsets of the range in the file
         job_id: Upload job ID for tracking progress
         db: Database session
+
+    Returns:
+        Dict with rows read and rows staged for the range
     """
-    logger.info(f"⚙️ Starting CSV content processing for job {job_id}")
-    reader = csv.DictReader(StringIO(csv_content))
+    sku_index, name_index, description_index = column_indexes
+    range_start, range_end = byte_range
+    range_size = range_end - range_start
     batch = []
     total = 0
-    created = 0
-    updated = 0
+    # Row estimate already added to the job row
+    reported_rows = 0
 
     # Get job
-    logger.info(f"📊 Looking up job record for processing: {job_id}")
-    job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
+    logger.info("📊 Looking up job record for processing: %s", job_id)
+    job = db.get(UploadJob, uuid.UUID(job_id))
     if not job:
-        logger.error(f"❌ Job not found for processing: {job_id}")
+        logger.error("❌ Job not found for processing: %s", job_id)
         raise ValueError(f"Job {job_id} not found")
 
-    logger.info(f"✅ Found job for processing: total_rows={job.total_rows}")
+    logger.info("✅ Found job for processing: bytes %d-%d", range_start, range_end)
+
+    # Bind everything the row loop touches to locals, which CPython
+    # resolves faster than globals and attribute lookups
+    strip = str.strip
+    lower = str.lower
+    append = batch.append
+    batch_size = BATCH_SIZE
+    if description_index is None:
+        description_index = sys.maxsize  # never < row length
 
     logger.info("🔄 Starting CSV row processing...")
-    for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
+    last_progress_at = time.monotonic()
+    rows_read = 0
+    for rows_read, row in enumerate(reader, start=1):
+        row_length = len(row)
+        sku = strip(row[sku_index]) if sku_index < row_length else ""
+        name = strip(row[name_index]) if name_index < row_length else ""
+
         # Validate: sku and name required
-        if not row.get("sku") or not row.get("name"):
-            logger.warning(f"⚠️ Skipping invalid row {row_num}: missing sku or name")
+        if not sku or not name:
+            logger.warning(
+                "⚠️ Skipping invalid row %d after byte %d: missing sku or name",
+                rows_read,
+                range_start,
+            )
             continue
 
-        # Normalize SKU to lowercase
-        product_data = {
-            "sku": row["sku"].strip().lower(),
-            "name": row["name"].strip(),
-            "description": row.get("description", "").strip() or None,
-            "active": True,
-        }
+        description = strip(row[description_index]) if description_index < row_length else ""
 
-        batch.append(product_data)
+        # Normalize SKU to lowercase; the offset where the row ends orders
+        # it against every other row of the file
+        append((job_id, lines.position, lower(sku), name, description or None))
         total += 1
 
-        if len(batch) >= BATCH_SIZE:
-            logger.info(f"📦 Processing batch of {len(batch)} products (total processed: {total})")
-            created_count, updated_count = upsert_batch(batch, db)
-            created += created_count
-            updated += updated_count
-            logger.info(f"✅ Batch processed: created={created_count}, updated={updated_count}")
-
-            update_progress(job_id, total, created, updated, db)
-
-            # Send progress webhook
-            from app.services.webhook_service import trigger_webhooks
-            import asyncio
-            asyncio.run(
-                trigger_webhooks(
-                    "import.progress",
-                    {
-                        "event": "import.progress",
-                        "data": {
-                            "job_id": job_id,
-                            "processed": total,
-                            "total": job.total_rows,
-                            "created": created,
-                            "updated": updated,
-                            "progress_percent": round((total / job.total_rows) * 100, 1)
-                        }
-                    },
-                    db
-                )
+        if len(batch) >= batch_size:
+            logger.debug("📦 Staging batch of %d products (total staged: %d)", len(batch), total)
+            stage_batch(batch, db)
+            batch.clear()  # keeps the bound append valid
+
+            # Throttle progress writes to one per interval
+            now = time.monotonic()
+            if now - last_progress_at < PROGRESS_INTERVAL:
+                continue
+            last_progress_at = now
+
+            # Extrapolate the range's row count from the share read so far
+            bytes_read = max(lines.position - range_start, 1)
+            estimated_rows = max(rows_read, rows_read * range_size // bytes_read)
+            _, job_total, _, _ = update_progress(
+                job_id, 0, 0, 0, db, total_rows=estimated_rows - reported_rows
             )
-
-            logger.info(f"📊 Progress updated: {total}/{job.total_rows} rows processed")
-            batch = []
+            reported_rows = estimated_rows
+            logger.debug("📊 Row estimate updated: %d rows in job", job_total)
 
     # Process remaining batch
     if batch:
-        logger.info(f"📦 Processing final batch of {len(batch)} products")
-        created_count, updated_count = upsert_batch(batch, db)
-        created += created_count
-        updated += updated_count
-        logger.info(f"✅ Final batch processed: created={created_count}, updated={updated_count}")
+        logger.info("📦 Staging final batch of %d products", len(batch))
+        stage_batch(batch, db)
 
-        update_progress(job_id, total, created, updated, db)
+    # Final progress update (always written, even if throttled above); the
+    # row estimate is replaced by the exact count
+    update_progress(job_id, 0, 0, 0, db, total_rows=rows_read - reported_rows)
+    logger.info("🏁 CSV processing completed for job %s: rows=%d, staged=%d", job_id, rows_read, total)
+    return {"rows": rows_read, "processed": total}
 
-    # Final progress update
-    logger.info(f"🏁 CSV processing completed for job {job_id}: total={total}, created={created}, updated={updated}")
 
-
-def upsert_batch(products: list, db: Session) -> tuple[int, int]:
+def _column_indexes(header: list[str]) -> tuple[int, int, Optional[int]]:
     """
-    PostgreSQL INSERT ... ON CONFLICT DO UPDATE.
-    Case-insensitive SKU matching using the unique index.
+    Locate the product columns in a CSV header row.
 
     Args:
-        products: List of product dictionaries
-        db: Database session
+        header: Header row from csv.reader
 
     Returns:
-        Tuple of (created_count, updated_count)
+        Tuple of (sku_index, name_index, description_index or None)
     """
-    if not products:
-        logger.debug("Empty batch, skipping upsert")
-        return 0, 0
+    # Strip whitespace and a UTF-8 BOM some spreadsheet exports prepend
+    columns = {column.strip("\ufeff \t"): index for index, column in enumerate(header)}
+    for required in ("sku", "name"):
+        if required not in columns:
+            raise ValueError(f"CSV is missing required column: {required}")
+    return columns["sku"], columns["name"], columns.get("description")
 
-    # CRITICAL FIX: Deduplicate by SKU within batch (keep last occurrence)
-    # PostgreSQL rejects UPSERT if same SKU appears multiple times in one INSERT
-    unique_products = {}
-    for product in products:
-        unique_products[product["sku"]] = product
 
-    # Convert back to list
-    deduped_products = list(unique_products.values())
+def create_staging_table(db: Session) -> None:
+    """
+    Create the import staging table if it does not exist yet.
 
-    # Log if duplicates were found
-    duplicates_removed = len(products) - len(deduped_products)
-    if duplicates_removed > 0:
-        logger.warning(f"⚠️ Removed {duplicates_removed} duplicate SKUs within batch")
+    Called once per import before its chunks are dispatched, since
+    concurrent CREATE TABLE IF NOT EXISTS can still conflict in PostgreSQL.
 
-    batch_size = len(deduped_products)
-    logger.debug(f"🔄 Starting upsert for batch of {batch_size} products (after deduplication)")
+    Args:
+        db: Database session
+    """
+    db.execute(text(STAGING_TABLE_SQL))
+    db.commit()
 
-    # Check existing SKUs to count creates vs updates
-    existing_skus = {p["sku"] for p in deduped_products}
-    logger.debug(f"🔍 Checking {len(existing_skus)} SKUs for conflicts")
 
-    existing_count = (
-        db.query(Product).filter(func.lower(Product.sku).in_(existing_skus)).count()
-    )
-    logger.debug(f"📊 Found {existing_count} existing SKUs in batch")
-
-    # PostgreSQL UPSERT
-    logger.debug("⚡ Executing PostgreSQL UPSERT statement")
-    stmt = insert(Product).values(deduped_products)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=["sku"],  # Uses the LOWER(sku) unique index
-        set_={
-            "name": stmt.excluded.name,
-            "description": stmt.excluded.description,
-            "updated_at": func.now(),
-        },
-    )
-    db.execute(stmt)
+def stage_batch(rows: list, db: Session) -> None:
+    """
+    Bulk load a batch into the staging table with COPY.
+
+    Args:
+        rows: List of (job_id, position, sku, name, description) tuples
+        db: Database session
+    """
+    if not rows:
+        logger.debug("Empty batch, skipping staging")
+        return
+
+    # Serialize the batch as CSV for COPY (None becomes an unquoted empty
+    # field, which COPY reads as NULL)
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+
+    with db.connection().connection.cursor() as cursor:
+        cursor.copy_expert(COPY_STAGING_SQL, buffer)
     db.commit()
+    logger.debug("✅ Staged batch of %d products", len(rows))
 
-    created = batch_size - existing_count
-    updated = existing_count
-    logger.debug(f"✅ Upsert completed: created={created}, updated={updated}")
-    return created, updated
 
+def merge_staged_rows(job_id: str, db: Session) -> None:
+    """
+    UPSERT every staged row of an import into products, in file order.
 
-def update_progress(
-    job_id: str, processed: int, created: int, updated: int, db: Session
-) -> None:
+    Rows are merged in windows of BATCH_SIZE, oldest first, so later rows
+    overwrite earlier ones across windows and each statement stays well
+    within the statement timeout. Within a window DISTINCT ON keeps the
+    last occurrence of each SKU, since PostgreSQL rejects an UPSERT that
+    touches the same row twice; xmax = 0 only for freshly inserted tuples,
+    which tells creates from updates.
+
+    Each window is deleted from staging and added to the job's counters in
+    one transaction, so a redelivered task resumes where it stopped.
+
+    Args:
+        job_id: Upload job ID
+        db: Database session
     """
-    Update job progress in database.
+    last_progress_at = time.monotonic()
+    while True:
+        merged, created, updated = db.execute(
+            text(MERGE_STAGED_WINDOW_SQL), {"job_id": job_id, "limit": BATCH_SIZE}
+        ).one()
+        if not merged:
+            db.rollback()
+            return
+
+        duplicates_removed = merged - created - updated
+        if duplicates_removed > 0:
+            logger.warning("⚠️ Removed %d duplicate SKUs within batch", duplicates_removed)
+
+        # Commits the window together with the job's counters
+        job_processed, job_total, job_created, job_updated = update_progress(
+            job_id, merged, created, updated, db
+        )
+        invalidate_cache("products", "product")
+        logger.debug("✅ Window merged: created=%d, updated=%d", created, updated)
+
+        # Throttle progress webhooks to one per interval
+        now = time.monotonic()
+        if now - last_progress_at < PROGRESS_INTERVAL:
+            continue
+        last_progress_at = now
+
+        # Send progress webhook with job-wide counts
+        send_webhook_event.delay(
+            "import.progress",
+            {
+                "event": "import.progress",
+                "data": {
+                    "job_id": job_id,
+                    "processed": job_processed,
+                    "total": job_total,
+                    "created": job_created,
+                    "updated": job_updated,
+                    "progress_percent": round((job_processed / max(job_total, 1)) * 100, 1)
+                }
+            },
+        )
+
+
+def clear_staged_rows(job_id: str, db: Session) -> None:
+    """
+    Drop whatever an import left in the staging table.
 
     Args:
         job_id: Upload job ID
-        processed: Number of rows processed
-        created: Number of products created
-        updated: Number of products updated
         db: Database session
     """
-    job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
-    if job:
-        job.processed_rows = processed
-        job.created_rows = created
-        job.updated_rows = updated
-        db.commit()
+    db.execute(text(CLEAR_STAGED_JOB_SQL), {"job_id": job_id})
+    db.commit()
 
 
-def count_csv_rows(csv_content: str) -> int:
+def update_progress(
+    job_id: str,
+    processed: int,
+    created: int,
+    updated: int,
+    db: Session,
+    total_rows: int = 0,
+) -> tuple[int, int, int, int]:
     """
-    Count total rows in CSV (excluding header).
+    Add to a job's progress counters in the database.
+
+    Counters are incremented in a single UPDATE, so concurrent chunk tasks
+    of the same import can report progress without overwriting each other.
 
     Args:
-        csv_content: CSV file content as string
+        job_id: Upload job ID
+        processed: Rows merged into products since the last update
+        created: Products created since the last update
+        updated: Products updated since the last update
+        db: Database session
+        total_rows: Change to the job's total row count (or estimate)
 
     Returns:
-        Number of data rows
+        Job-wide (processed_rows, total_rows, created_rows, updated_rows)
     """
-    reader = csv.DictReader(StringIO(csv_content))
-    return sum(1 for _ in reader)
+    counts = db.execute(
+        update(UploadJob)
+        .where(UploadJob.id == job_id)
+        .values(
+            processed_rows=UploadJob.processed_rows + processed,
+            created_rows=UploadJob.created_rows + created,
+            updated_rows=UploadJob.updated_rows + updated,
+            total_rows=UploadJob.total_rows + total_rows,
+        )
+        .returning(
+            UploadJob.processed_rows,
+            UploadJob.total_rows,
+            UploadJob.created_rows,
+            UploadJob.updated_rows,
+        )
+    ).one()
+    db.commit()
+    return tuple(counts)
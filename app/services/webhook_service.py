@@ -1,12 +1,21 @@
 """Webhook service for triggering event notifications."""
 import asyncio
+import logging
+import random
 import time
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
+import redis
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.models.webhook import Webhook
+from app.redis import redis_client
+
+logger = logging.getLogger(__name__)
 
 # Supported webhook event types
 WEBHOOK_EVENTS = [
@@ -19,9 +28,99 @@ WEBHOOK_EVENTS = [
     "import.failed",
 ]
 
+WEBHOOK_TIMEOUT = 5.0
+MAX_CONCURRENT_DELIVERIES = 32
+WEBHOOK_MAX_ATTEMPTS = 3
+WEBHOOK_RETRY_BASE_DELAY = 0.1  # seconds, doubled after each attempt
+WEBHOOK_DLQ_KEY = "webhook_dlq"
+
+# Enabled webhook URLs per event type, cached per process. The API clears
+# its own copy on webhook CRUD; other processes (Celery workers) pick up
+# changes within the TTL.
+WEBHOOK_URL_CACHE_TTL = 30.0
+_webhook_url_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+# Shared client so deliveries reuse keep-alive (and HTTP/2) connections,
+# plus a semaphore capping in-flight deliveries. Both are bound to the event
+# loop that created them: the API server's loop, or the one loop each Celery
+# worker process keeps for send_webhook_event. They are rebuilt only if that
+# loop changes, e.g. after a worker process is replaced.
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_delivery_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client for the running event loop."""
+    global _client, _client_loop, _delivery_slots
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=WEBHOOK_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=100),
+        )
+        _client_loop = loop
+        _delivery_slots = asyncio.Semaphore(MAX_CONCURRENT_DELIVERIES)
+    return _client
+
+
+def _get_delivery_slots() -> asyncio.Semaphore:
+    """Get the in-flight delivery semaphore for the running event loop."""
+    _get_client()
+    return _delivery_slots
+
+
+async def close_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)."""
+    global _client, _client_loop, _delivery_slots
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+    _delivery_slots = None
+
+
+def get_enabled_webhook_urls(event_type: str, db: Session) -> List[str]:
+    """
+    Get URLs of enabled webhooks for an event type, cached for a short TTL.
+
+    Empty results are cached too, so events nobody subscribes to skip the
+    database entirely.
+
+    Args:
+        event_type: Type of event (e.g., "product.created")
+        db: Database session
+
+    Returns:
+        List of webhook URLs
+    """
+    now = time.monotonic()
+    cached = _webhook_url_cache.get(event_type)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    urls = list(
+        db.scalars(
+            select(Webhook.url).where(
+                Webhook.event_type == event_type, Webhook.enabled == True
+            )
+        )
+    )
+    _webhook_url_cache[event_type] = (now + WEBHOOK_URL_CACHE_TTL, urls)
+    return urls
+
+
+def clear_webhook_url_cache() -> None:
+    """Drop cached webhook URLs (call after webhooks are changed)."""
+    _webhook_url_cache.clear()
+
 
 async def trigger_webhooks(
-    event_type: str, payload: Dict[str, Any], db: Session
+    event_type: str,
+    payload: Dict[str, Any],
+    db: Session,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> None:
     """
     Send webhook to all enabled webhooks for this event type.
@@ -31,65 +130,164 @@ async def trigger_webhooks(
         event_type: Type of event (e.g., "product.created")
         payload: Event data to send
         db: Database session
+        client: HTTP client to send with (defaults to the shared client)
     """
     # Get enabled webhooks for this event type
-    webhooks = (
-        db.query(Webhook)
-        .filter(Webhook.event_type == event_type, Webhook.enabled == True)
-        .all()
-    )
+    urls = get_enabled_webhook_urls(event_type, db)
+    await _deliver_webhooks(urls, payload, client)
+
+
+async def _deliver_webhooks(
+    urls: List[str],
+    payload: Dict[str, Any],
+    client: Optional[httpx.AsyncClient] = None,
+) -> None:
+    """
+    Send one payload to every URL concurrently.
 
-    if not webhooks:
+    Args:
+        urls: Webhook URLs to deliver to
+        payload: Event data to send
+        client: HTTP client to send with (defaults to the shared client)
+    """
+    if not urls:
         return
 
+    # Encode once; every subscriber receives the same bytes
+    body = orjson.dumps(payload)
+
     # Send webhooks asynchronously
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        tasks = [_send_webhook(client, webhook.url, payload) for webhook in webhooks]
-        # Gather all tasks, don't raise on exceptions
-        await asyncio.gather(*tasks, return_exceptions=True)
+    client = client or _get_client()
+    slots = _get_delivery_slots()
+    tasks = [_send_webhook(client, url, body, slots) for url in urls]
+    # Gather all tasks, don't raise on exceptions
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def dispatch_webhooks(event_type: str, payload: Dict[str, Any]) -> None:
+    """
+    Trigger webhooks using a dedicated database session.
+
+    Intended for FastAPI background tasks, which run after the response
+    is sent and the request's session has been closed.
+
+    Args:
+        event_type: Type of event (e.g., "product.created")
+        payload: Event data to send
+    """
+    try:
+        # The lookup blocks, so keep it off the event loop
+        urls = await asyncio.to_thread(_load_webhook_urls, event_type)
+        await _deliver_webhooks(urls, payload)
+    except Exception:
+        logger.exception("Failed to dispatch %s webhooks", event_type)
+
+
+def _load_webhook_urls(event_type: str) -> List[str]:
+    """Look up enabled webhook URLs with a short-lived session."""
+    db = SessionLocal()
+    try:
+        return get_enabled_webhook_urls(event_type, db)
+    finally:
+        db.close()
 
 
 async def _send_webhook(
-    client: httpx.AsyncClient, url: str, payload: Dict[str, Any]
+    client: httpx.AsyncClient, url: str, body: bytes, slots: asyncio.Semaphore
 ) -> None:
     """
     Send a single webhook request.
 
+    Timeouts, transport errors and 5xx responses are retried with jittered
+    exponential backoff. Deliveries that still fail are pushed to the
+    dead-letter list in Redis for later replay.
+
     Args:
         client: HTTP client
         url: Webhook URL
-        payload: Event data
+        body: JSON-encoded event data
+        slots: Semaphore bounding concurrent deliveries
     """
+    error = None
+    for attempt in range(WEBHOOK_MAX_ATTEMPTS):
+        if attempt:
+            # Back off without holding a delivery slot
+            delay = WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempt - 1)
+            await asyncio.sleep(delay + random.random() * 0.05)
+        try:
+            async with slots:
+                response = await client.post(
+                    url,
+                    content=body,
+                    headers={"Content-Type": "application/json"},
+                )
+        except httpx.TransportError as e:  # includes timeouts
+            error = e
+            continue
+        except Exception as e:
+            # Log error but don't fail the main operation
+            logger.warning("Failed to send webhook to %s: %s", url, e)
+            return
+        if response.status_code < 500:
+            return
+        error = f"HTTP {response.status_code}"
+
+    logger.warning(
+        "Failed to send webhook to %s after %d attempts: %s",
+        url,
+        WEBHOOK_MAX_ATTEMPTS,
+        error,
+    )
+    await _dead_letter(url, body, str(error))
+
+
+async def _dead_letter(url: str, body: bytes, error: str) -> None:
+    """
+    Record an undeliverable webhook in the Redis dead-letter list.
+
+    Args:
+        url: Webhook URL
+        body: JSON-encoded event data
+        error: Last delivery error
+    """
+    entry = orjson.dumps(
+        {"url": url, "payload": orjson.loads(body), "error": error, "ts": time.time()}
+    )
     try:
-        await client.post(url, json=payload)
-    except Exception as e:
-        # Log error but don't fail the main operation
-        print(f"Failed to send webhook to {url}: {e}")
+        await asyncio.to_thread(redis_client.rpush, WEBHOOK_DLQ_KEY, entry)
+    except redis.RedisError as e:
+        logger.warning("Failed to dead-letter webhook to %s: %s", url, e)
 
 
-async def test_webhook(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+async def test_webhook(
+    url: str, payload: Dict[str, Any], client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Any]:
     """
     Test a webhook by sending a sample payload and measuring response.
 
     Args:
         url: Webhook URL to test
         payload: Test payload
+        client: HTTP client to send with (defaults to the shared client)
 
     Returns:
         Dict with test results including status code and response time
     """
-    start_time = time.time()
+    start_time = time.perf_counter()
 
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(url, json=payload)
-            response_time = time.time() - start_time
-
-            return {
-                "success": True,
-                "status_code": response.status_code,
-                "response_time": round(response_time, 3),
-            }
+        response = await (client or _get_client()).post(
+            url,
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+        )
+        response_time = time.perf_counter() - start_time
+
+        return {
+            "success": True,
+            "status_code": response.status_code,
+            "response_time": round(response_time, 3),
+        }
     except httpx.TimeoutException:
         return {
             "success": False,
@@ -97,7 +295,7 @@ async def test_webhook(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
             "response_time": 5.0,
         }
     except Exception as e:
-        response_time = time.time() - start_time
+        response_time = time.perf_counter() - start_time
         return {
             "success": False,
             "error": str(e),
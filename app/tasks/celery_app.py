@@ -11,7 +11,7 @@ celery_app = Celery(
     "product_importer",
     broker=settings.redis_url,
     backend=settings.redis_url,
-    include=["app.tasks.import_tasks"],
+    include=["app.tasks.import_tasks", "app.tasks.webhook_tasks"],
 )
 
 celery_app.conf.update(
@@ -21,6 +21,16 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # Webhook delivery is network-bound; keep it off the import workers' queue
+    task_routes={"app.tasks.webhook_tasks.*": {"queue": "webhooks"}},
+    # Imports run for minutes: reserve one task at a time, acknowledge only
+    # once it finishes, and requeue it if the worker process dies
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Recycle worker processes to release memory held after large imports
+    worker_max_tasks_per_child=50,
+    broker_pool_limit=settings.celery_broker_pool_limit,
     # SSL support for Upstash Redis (TLS required)
     broker_use_ssl={
         'ssl_cert_reqs': ssl.CERT_NONE,
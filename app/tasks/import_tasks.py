@@ -1,25 +1,40 @@
 """Celery tasks for CSV import processing."""
 import logging
+import math
 import os
-import asyncio
+import uuid
 from pathlib import Path
+from typing import Optional
+
+from celery import chord
 
 from app.config import get_settings
-from app.database import SessionLocal
+from app.database import ImportSession
 from app.models.upload_job import UploadJob
-from app.services.csv_processor import count_csv_rows, process_csv_content
-from app.services.webhook_service import trigger_webhooks
+from app.services.csv_processor import (
+    clear_staged_rows,
+    create_staging_table,
+    merge_staged_rows,
+    process_csv_content,
+    split_ranges,
+)
 from app.tasks.celery_app import celery_app
+from app.tasks.webhook_tasks import send_webhook_event
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Smallest byte range worth a task of its own
+MIN_CHUNK_BYTES = 4 * 1024 * 1024
+
 
 @celery_app.task(bind=True)
 def process_csv_import(self, job_id: str, file_path: str) -> dict:
     """
-    Process CSV file from local storage in background.
-    Can take 3-5 minutes for 500K rows.
+    Start importing a CSV file from local storage in background.
+    Splits the file into byte ranges and stages them in parallel as a
+    chord of process_csv_chunk tasks; finalize_import merges the staged
+    rows into products in file order and completes the job.
     This runs in Celery worker, NOT in web request context.
 
     Args:
@@ -28,95 +43,155 @@ def process_csv_import(self, job_id: str, file_path: str) -> dict:
         file_path: Local path to CSV file
 
     Returns:
-        Dict with job status and counts
+        Dict with job status and number of chunks
     """
-    logger.info(f"🚀 Starting CSV import task: job_id={job_id}, file_path={file_path}")
+    logger.info("🚀 Starting CSV import task: job_id=%s, file_path=%s", job_id, file_path)
 
-    db = SessionLocal()
-    logger.info(f"🔌 Database connection established for job {job_id}")
+    db = ImportSession()
+    logger.debug("🔌 Database connection established for job %s", job_id)
+    job = None
 
     try:
         # Update status to processing
-        logger.info(f"📊 Looking up job record: {job_id}")
-        job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
+        logger.debug("📊 Looking up job record: %s", job_id)
+        job = db.get(UploadJob, uuid.UUID(job_id))
         if not job:
-            logger.error(f"❌ Job not found in database: {job_id}")
+            logger.error("❌ Job not found in database: %s", job_id)
             raise ValueError(f"Job {job_id} not found")
 
-        logger.info(f"✅ Found job record: filename={job.filename}, current_status={job.status}")
+        logger.debug("✅ Found job record: filename=%s, current_status=%s", job.filename, job.status)
 
         job.status = "processing"
         db.commit()
-        logger.info(f"📊 Job status updated to 'processing' for job {job_id}")
+        logger.debug("📊 Job status updated to 'processing' for job %s", job_id)
 
         # Trigger import.started webhook
-        logger.info(f"🪝 Triggering import.started webhook for job {job_id}")
-        asyncio.run(
-            trigger_webhooks(
-                "import.started",
-                {
-                    "event": "import.started",
-                    "data": {"job_id": job_id, "filename": job.filename},
-                },
-                db,
-            )
+        logger.debug("🪝 Triggering import.started webhook for job %s", job_id)
+        send_webhook_event.delay(
+            "import.started",
+            {
+                "event": "import.started",
+                "data": {"job_id": job_id, "filename": job.filename},
+            },
         )
-        logger.info(f"✅ Import.started webhook triggered for job {job_id}")
+        logger.debug("✅ Import.started webhook triggered for job %s", job_id)
 
         # Check if file exists
         if not os.path.exists(file_path):
-            logger.error(f"❌ CSV file not found: {file_path}")
+            logger.error("❌ CSV file not found: %s", file_path)
             raise FileNotFoundError(f"CSV file not found: {file_path}")
 
         file_size = os.path.getsize(file_path)
-        logger.info(f"📁 Found CSV file: {file_path} ({file_size} bytes)")
+        logger.debug("📁 Found CSV file: %s (%d bytes)", file_path, file_size)
 
-        # Read CSV from local file (no Supabase needed!)
-        logger.info(f"📖 Reading CSV content from file: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            csv_content = f.read()
+        # One chunk per worker process, unless the file is too small to split
+        parts = max(1, min(settings.celery_concurrency, math.ceil(file_size / MIN_CHUNK_BYTES)))
+        ranges = split_ranges(file_path, parts)
+        create_staging_table(db)
+        logger.debug("✂️ Split CSV into %d chunks for job %s", len(ranges), job_id)
 
-        content_length = len(csv_content)
-        logger.info(f"✅ CSV content loaded: {content_length} characters")
+        callback = finalize_import.s(job_id, file_path).on_error(
+            fail_import.s(job_id, file_path)
+        )
+        if ranges:
+            chord(
+                process_csv_chunk.s(job_id, file_path, start, end)
+                for start, end in ranges
+            )(callback)
+        else:
+            callback.delay([])  # header-only file
+        logger.info("✅ %d CSV chunks dispatched for job %s", len(ranges), job_id)
 
-        # Count total rows for progress tracking
-        logger.info("🔢 Counting total CSV rows...")
-        total_rows = count_csv_rows(csv_content)
-        job.total_rows = total_rows
-        db.commit()
-        logger.info(f"✅ Total rows counted: {total_rows} for job {job_id}")
+        return {"status": "processing", "job_id": job_id, "chunks": len(ranges)}
+
+    except Exception as e:
+        logger.error("💥 Task failed for job %s: %s", job_id, e, exc_info=True)
+        _mark_failed(db, job_id, str(e), job)
+        _cleanup_file(file_path)
+        raise
+
+    finally:
+        logger.debug("🔌 Closing database connection for job %s", job_id)
+        db.close()
+
+
+@celery_app.task
+def process_csv_chunk(job_id: str, file_path: str, start: int, end: int) -> dict:
+    """
+    Stage one byte range of a CSV file.
+
+    Args:
+        job_id: Upload job ID
+        file_path: Local path to CSV file
+        start: Byte offset of the first row in the chunk
+        end: Byte offset just past the last row in the chunk
+
+    Returns:
+        Dict with rows read and rows staged
+    """
+    logger.debug("⚙️ Processing CSV chunk %d-%d for job %s", start, end, job_id)
+    db = ImportSession()
+    try:
+        return process_csv_content(file_path, job_id, db, byte_range=(start, end))
+    finally:
+        db.close()
 
-        # Process CSV in batches
-        logger.info(f"⚙️ Starting CSV processing in batches for job {job_id}")
-        process_csv_content(csv_content, job_id, db)
-        logger.info(f"✅ CSV processing completed for job {job_id}")
 
-        # Mark complete
-        logger.info(f"🏁 Marking job as completed: {job_id}")
-        job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
+@celery_app.task
+def finalize_import(chunk_results: list, job_id: str, file_path: str) -> dict:
+    """
+    Complete an import once every chunk has finished.
+
+    Args:
+        chunk_results: Return values of the process_csv_chunk tasks
+        job_id: Upload job ID
+        file_path: Local path to CSV file
+
+    Returns:
+        Dict with job status and counts
+    """
+    db = ImportSession()
+    try:
+        job = db.get(UploadJob, uuid.UUID(job_id))
+        if job.status == "completed":
+            # Redelivered after the job was completed
+            logger.warning("⚠️ Import already finalized: %s", job_id)
+            return {
+                "status": "completed",
+                "job_id": job_id,
+                "total_rows": job.total_rows,
+                "created": job.created_rows,
+                "updated": job.updated_rows,
+            }
+
+        # Merge in file order so the last row of each SKU wins; counters
+        # are committed with each window, so a redelivery resumes the merge
+        merge_staged_rows(job_id, db)
+        db.refresh(job)
+
+        # Mark complete with the exact row count
+        logger.debug("🏁 Marking job as completed: %s", job_id)
         job.status = "completed"
+        job.total_rows = sum(result["rows"] for result in chunk_results)
         db.commit()
-        logger.info(f"✅ Job marked as completed: created={job.created_rows}, updated={job.updated_rows}")
+        logger.debug("✅ Job marked as completed: created=%d, updated=%d", job.created_rows, job.updated_rows)
 
         # Trigger import.completed webhook
-        logger.info(f"🪝 Triggering import.completed webhook for job {job_id}")
-        asyncio.run(
-            trigger_webhooks(
-                "import.completed",
-                {
-                    "event": "import.completed",
-                    "data": {
-                        "job_id": job_id,
-                        "filename": job.filename,
-                        "total_rows": job.total_rows,
-                        "created": job.created_rows,
-                        "updated": job.updated_rows,
-                    },
+        logger.debug("🪝 Triggering import.completed webhook for job %s", job_id)
+        send_webhook_event.delay(
+            "import.completed",
+            {
+                "event": "import.completed",
+                "data": {
+                    "job_id": job_id,
+                    "filename": job.filename,
+                    "total_rows": job.total_rows,
+                    "created": job.created_rows,
+                    "updated": job.updated_rows,
                 },
-                db,
-            )
+            },
         )
-        logger.info(f"✅ Import.completed webhook triggered for job {job_id}")
+        logger.debug("✅ Import.completed webhook triggered for job %s", job_id)
 
         result = {
             "status": "completed",
@@ -125,49 +200,66 @@ def process_csv_import(self, job_id: str, file_path: str) -> dict:
             "created": job.created_rows,
             "updated": job.updated_rows,
         }
-        logger.info(f"🎉 Task completed successfully: {result}")
+        logger.info("🎉 Import completed: %s", result)
         return result
+    finally:
+        db.close()
+        _cleanup_file(file_path)
 
-    except Exception as e:
-        logger.error(f"💥 Task failed for job {job_id}: {str(e)}", exc_info=True)
-
-        # Mark failed
-        logger.info(f"📊 Marking job as failed: {job_id}")
-        job = db.query(UploadJob).filter(UploadJob.id == job_id).first()
-        if job:
-            job.status = "failed"
-            job.error_message = str(e)
-            db.commit()
-            logger.info(f"✅ Job marked as failed in database: {job_id}")
-
-        # Trigger import.failed webhook
-        logger.info(f"🪝 Triggering import.failed webhook for job {job_id}")
-        asyncio.run(
-            trigger_webhooks(
-                "import.failed",
-                {
-                    "event": "import.failed",
-                    "data": {"job_id": job_id, "error": str(e)},
-                },
-                db,
-            )
-        )
-        logger.info(f"✅ Import.failed webhook triggered for job {job_id}")
 
-        logger.error(f"💥 Task failed completely for job {job_id}: {str(e)}")
-        raise
+@celery_app.task
+def fail_import(request, exc, traceback, job_id: str, file_path: str) -> None:
+    """
+    Errback for the import chord: mark the job failed when a chunk fails.
 
+    Args:
+        request: Request of the failed task
+        exc: Exception raised by the failed task
+        traceback: Traceback of the failure
+        job_id: Upload job ID
+        file_path: Local path to CSV file
+    """
+    logger.error("💥 Import chunk failed for job %s: %s", job_id, exc)
+    db = ImportSession()
+    try:
+        clear_staged_rows(job_id, db)
+        _mark_failed(db, job_id, str(exc))
     finally:
-        logger.info(f"🔌 Closing database connection for job {job_id}")
         db.close()
+        _cleanup_file(file_path)
 
-        # Clean up temp file after processing
-        logger.info(f"🧹 Cleaning up temp file: {file_path}")
-        try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                logger.info(f"✅ Temp file cleaned up: {file_path}")
-            else:
-                logger.warning(f"⚠️ Temp file not found for cleanup: {file_path}")
-        except Exception as cleanup_error:
-            logger.warning(f"⚠️ Failed to clean up temp file {file_path}: {str(cleanup_error)}")
+
+def _mark_failed(db, job_id: str, error: str, job: Optional[UploadJob] = None) -> None:
+    """Mark an import job failed and trigger the import.failed webhook."""
+    logger.debug("📊 Marking job as failed: %s", job_id)
+    if job is None:
+        job = db.get(UploadJob, uuid.UUID(job_id))
+    if job:
+        job.status = "failed"
+        job.error_message = error
+        db.commit()
+        logger.debug("✅ Job marked as failed in database: %s", job_id)
+
+    # Trigger import.failed webhook
+    logger.debug("🪝 Triggering import.failed webhook for job %s", job_id)
+    send_webhook_event.delay(
+        "import.failed",
+        {
+            "event": "import.failed",
+            "data": {"job_id": job_id, "error": error},
+        },
+    )
+    logger.debug("✅ Import.failed webhook triggered for job %s", job_id)
+
+
+def _cleanup_file(file_path: str) -> None:
+    """Remove the uploaded temp file once the import is over."""
+    logger.debug("🧹 Cleaning up temp file: %s", file_path)
+    try:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            logger.debug("✅ Temp file cleaned up: %s", file_path)
+        else:
+            logger.warning("⚠️ Temp file not found for cleanup: %s", file_path)
+    except Exception as cleanup_error:
+        logger.warning("⚠️ Failed to clean up temp file %s: %s", file_path, cleanup_error)
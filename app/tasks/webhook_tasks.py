@@ -0,0 +1,39 @@
+"""Celery tasks for webhook delivery."""
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from app.database import SessionLocal
+from app.services.webhook_service import trigger_webhooks
+from app.tasks.celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+# One event loop per worker process, created lazily after fork, so the shared
+# HTTP client keeps its keep-alive connections from one event to the next
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Get this worker process's event loop."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+
+@celery_app.task(ignore_result=True)
+def send_webhook_event(event_type: str, payload: Dict[str, Any]) -> None:
+    """
+    Deliver an event to every enabled webhook subscribed to it.
+    Routed to the "webhooks" queue so slow subscribers never hold up imports.
+
+    Args:
+        event_type: Type of event (e.g., "import.completed")
+        payload: Event data to send
+    """
+    db = SessionLocal()
+    try:
+        _get_loop().run_until_complete(trigger_webhooks(event_type, payload, db))
+    finally:
+        db.close()
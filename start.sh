@@ -16,11 +16,13 @@ fi
 echo "✅ REDIS_URL configured"
 echo "🔄 Starting Celery worker in background..."
 
-# Start Celery worker with limited concurrency (free tier has low resources)
+# Start Celery worker with limited concurrency (free tier has low resources);
+# it consumes both the import queue and the webhook delivery queue
 celery -A app.tasks.celery_app worker \
     --loglevel=info \
-    --concurrency=1 \
-    --max-tasks-per-child=50 \
+    -Q celery,webhooks \
+    -P prefork \
+    --concurrency=${CELERY_CONCURRENCY:-1} \
     &
 
 # Store the Celery PID
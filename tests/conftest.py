@@ -1,17 +1,43 @@
 """Pytest configuration and fixtures."""
+from contextlib import asynccontextmanager
+
 import pytest
+import redis
+from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.database import Base, get_db
 from app.main import app
 
 
-@pytest.fixture
+class UnavailableRedis:
+    """Redis stand-in that is always down, so the response cache fails open."""
+
+    def __getattr__(self, name):
+        def unavailable(*args, **kwargs):
+            raise redis.RedisError("Redis is not available in tests")
+
+        return unavailable
+
+
+@asynccontextmanager
+async def noop_lifespan(app):
+    """Lifespan that skips table creation and pool warm-up on the real database."""
+    yield
+
+
+@pytest.fixture(scope="session")
 def test_db():
-    """Create a test database for testing."""
-    # Use in-memory SQLite for tests
-    engine = create_engine("sqlite:///:memory:")
+    """Create a test database shared by the whole test session."""
+    # Use shared in-memory SQLite for tests; StaticPool hands every session
+    # (including TestClient's worker threads) the same connection and schema
+    engine = create_engine(
+        "sqlite:///file:testdb?mode=memory&cache=shared&uri=true",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
     Base.metadata.create_all(bind=engine)
 
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -25,7 +51,23 @@ def test_db():
 
     app.dependency_overrides[get_db] = override_get_db
 
-    yield engine
+    with pytest.MonkeyPatch.context() as mp:
+        # Keep the cache and background webhook lookups off the real services
+        mp.setattr("app.services.cache.redis_client", UnavailableRedis())
+        mp.setattr("app.services.webhook_service.SessionLocal", TestingSessionLocal)
+        yield engine
 
     Base.metadata.drop_all(bind=engine)
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="session")
+def client(test_db):
+    """Test client shared by the whole session, using a no-op lifespan."""
+    original_lifespan = app.router.lifespan_context
+    app.router.lifespan_context = noop_lifespan
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.router.lifespan_context = original_lifespan
@@ -0,0 +1,124 @@
+"""Tests for splitting CSV files into row-aligned byte ranges."""
+import csv
+
+from app.services.csv_processor import _RangeLines, split_ranges
+
+HEADER = b"sku,name,description\n"
+
+
+def write_csv(tmp_path, body: bytes) -> str:
+    """Write a CSV file with the standard header and return its path."""
+    path = tmp_path / "products.csv"
+    path.write_bytes(body)
+    return str(path)
+
+
+def read_ranges(file_path: str, ranges: list) -> list:
+    """Parse every range on its own and concatenate the rows."""
+    rows = []
+    with open(file_path, "rb") as f:
+        for start, end in ranges:
+            lines = _RangeLines(f, start, end)
+            rows.extend(csv.reader(lines))
+            assert lines.position == end
+    return rows
+
+
+def read_whole(file_path: str) -> list:
+    """Parse the file in one pass, without the header."""
+    with open(file_path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_split_ranges_quoted_newlines(tmp_path):
+    """Test that newlines inside quoted fields are never split points."""
+    body = HEADER + b"".join(
+        b'sku-%d,Product %d,"line one\nline ""two""\n\nline three"\n' % (i, i)
+        for i in range(50)
+    )
+    file_path = write_csv(tmp_path, body)
+
+    for parts in (1, 2, 3, 7, 16):
+        ranges = split_ranges(file_path, parts)
+        assert ranges[0][0] == len(HEADER)
+        assert ranges[-1][1] == len(body)
+        assert read_ranges(file_path, ranges) == read_whole(file_path)
+
+
+def test_split_ranges_stray_quote_in_unquoted_field(tmp_path):
+    """Test that a literal quote in an unquoted field does not shift split points."""
+    body = HEADER + b'sku-tv,TV 5" screen,\n' + b"".join(
+        b'sku-%d,Product %d,"line one\nline two"\n' % (i, i) for i in range(20)
+    )
+    file_path = write_csv(tmp_path, body)
+
+    for parts in (2, 3, 5, 8):
+        ranges = split_ranges(file_path, parts)
+        rows = read_ranges(file_path, ranges)
+        assert len(rows) == 21
+        assert rows == read_whole(file_path)
+
+
+def test_split_ranges_crlf(tmp_path):
+    """Test files with CRLF line endings, including inside quoted fields."""
+    body = HEADER.replace(b"\n", b"\r\n") + b"".join(
+        b'sku-%d,Product %d,"first\r\nsecond"\r\n' % (i, i) for i in range(40)
+    )
+    file_path = write_csv(tmp_path, body)
+
+    for parts in (2, 5, 9):
+        ranges = split_ranges(file_path, parts)
+        assert len(ranges) > 1
+        assert read_ranges(file_path, ranges) == read_whole(file_path)
+
+
+def test_split_ranges_missing_trailing_newline(tmp_path):
+    """Test that the last row is kept when the file does not end in a newline."""
+    body = HEADER + b"".join(b"sku-%d,Product %d,\n" % (i, i) for i in range(30))
+    body += b'sku-last,Last Product,"no newline"'
+    file_path = write_csv(tmp_path, body)
+
+    ranges = split_ranges(file_path, 4)
+    rows = read_ranges(file_path, ranges)
+    assert rows == read_whole(file_path)
+    assert rows[-1] == ["sku-last", "Last Product", "no newline"]
+
+
+def test_split_ranges_more_parts_than_rows(tmp_path):
+    """Test that small files get at most one range per row."""
+    body = HEADER + b"sku-1,One,\nsku-2,Two,\n"
+    file_path = write_csv(tmp_path, body)
+
+    ranges = split_ranges(file_path, 10)
+    assert 1 <= len(ranges) <= 2
+    assert all(end > start for start, end in ranges)
+    assert read_ranges(file_path, ranges) == read_whole(file_path)
+
+
+def test_split_ranges_header_only(tmp_path):
+    """Test that a file without rows has no ranges."""
+    file_path = write_csv(tmp_path, HEADER)
+
+    assert split_ranges(file_path, 4) == []
+
+
+def test_range_lines_stops_at_range_end(tmp_path):
+    """Test that iteration stops at the end offset and tracks the position."""
+    file_path = write_csv(tmp_path, HEADER + b"a,1,\nb,2,\nc,3,\n")
+    start = len(HEADER)
+
+    with open(file_path, "rb") as f:
+        lines = _RangeLines(f, start, start + len(b"a,1,\nb,2,\n"))
+        assert list(lines) == ["a,1,\n", "b,2,\n"]
+        assert lines.position == start + len(b"a,1,\nb,2,\n")
+
+
+def test_range_lines_decodes_utf8(tmp_path):
+    """Test that multi-byte characters are decoded and counted in bytes."""
+    row = "sku-é,Café,naïve\n".encode("utf-8")
+    file_path = write_csv(tmp_path, HEADER + row)
+
+    with open(file_path, "rb") as f:
+        lines = _RangeLines(f, len(HEADER), len(HEADER) + len(row))
+        assert list(csv.reader(lines)) == [["sku-é", "Café", "naïve"]]
+        assert lines.position == len(HEADER) + len(row)
@@ -1,20 +1,21 @@
 """Tests for product CRUD operations."""
-import pytest
-from fastapi.testclient import TestClient
+from datetime import datetime
 
-from app.main import app
+import pytest
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
 
-client = TestClient(app)
+from app.models.product import Product
 
 
-def test_health_check():
+def test_health_check(client):
     """Test health check endpoint."""
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
 
 
-def test_list_products():
+def test_list_products(client):
     """Test listing products with pagination."""
     response = client.get("/api/products")
     assert response.status_code == 200
@@ -26,7 +27,7 @@ def test_list_products():
     assert "pages" in data
 
 
-def test_create_product():
+def test_create_product(client):
     """Test creating a new product."""
     product_data = {
         "sku": "TEST-SKU-001",
@@ -41,7 +42,7 @@ def test_create_product():
     assert data["name"] == product_data["name"]
 
 
-def test_create_duplicate_sku():
+def test_create_duplicate_sku(client):
     """Test that duplicate SKUs are rejected (case-insensitive)."""
     product_data = {
         "sku": "DUPLICATE-SKU",
@@ -61,7 +62,7 @@ def test_create_duplicate_sku():
     assert "already exists" in response.json()["detail"].lower()
 
 
-def test_search_products():
+def test_search_products(client):
     """Test searching products by SKU and name."""
     # Search by SKU
     response = client.get("/api/products?search=TEST")
@@ -72,9 +73,88 @@ def test_search_products():
     assert response.status_code == 200
 
 
+def test_cursor_pagination(client, test_db):
+    """Test keyset pagination with next_cursor, including same-timestamp rows."""
+    # Explicit timestamps ahead of every other row keep the first pages
+    # independent of test order and of the database's clock precision
+    first_at = datetime(2100, 1, 2)
+    tied_at = datetime(2100, 1, 1)
+    with Session(test_db) as db:
+        products = [
+            Product(sku="cursor-a", name="Cursor A", created_at=first_at),
+            Product(sku="cursor-b", name="Cursor B", created_at=tied_at),
+            Product(sku="cursor-c", name="Cursor C", created_at=tied_at),
+        ]
+        db.add_all(products)
+        db.commit()
+        expected = [products[0].id, products[2].id, products[1].id]
+
+    try:
+        response = client.get("/api/products?page_size=1&include_total=false")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] is None
+
+        seen = [item["id"] for item in data["items"]]
+        while len(seen) < len(expected):
+            assert data["next_cursor"]
+            response = client.get(
+                "/api/products", params={"page_size": 1, "cursor": data["next_cursor"]}
+            )
+            assert response.status_code == 200
+            data = response.json()
+            seen.extend(item["id"] for item in data["items"])
+        assert seen == expected
+    finally:
+        with Session(test_db) as db:
+            db.execute(delete(Product).where(Product.id.in_(expected)))
+            db.commit()
+
+
+def test_invalid_cursor(client):
+    """Test that malformed cursors are rejected."""
+    response = client.get("/api/products?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_update_product_duplicate_sku(client):
+    """Test that updating to an existing SKU is rejected (case-insensitive)."""
+    first = client.post(
+        "/api/products", json={"sku": "UPDATE-SKU-A", "name": "First Product"}
+    )
+    second = client.post(
+        "/api/products", json={"sku": "UPDATE-SKU-B", "name": "Second Product"}
+    )
+    assert first.status_code == 201
+    assert second.status_code == 201
+
+    response = client.put(
+        f"/api/products/{second.json()['id']}", json={"sku": "update-sku-a"}
+    )
+    assert response.status_code == 400
+    assert "already exists" in response.json()["detail"].lower()
+
+    response = client.put(
+        f"/api/products/{second.json()['id']}", json={"name": "Renamed Product"}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed Product"
+    assert response.json()["sku"] == "update-sku-b"
+
+
+def test_bulk_delete(client):
+    """Test deleting all products returns the deleted count."""
+    client.post("/api/products", json={"sku": "BULK-SKU-001", "name": "Bulk Product"})
+
+    response = client.delete("/api/products/bulk/all")
+    assert response.status_code == 200
+    assert response.json()["deleted_count"] >= 1
+
+    response = client.get("/api/products")
+    assert response.json()["total"] == 0
+
+
 # Add more tests as needed:
-# - test_update_product()
 # - test_delete_product()
-# - test_bulk_delete()
 # - test_filter_by_active()
 # - test_pagination()